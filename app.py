@@ -1,7 +1,9 @@
+import re
 import streamlit as st
 import sqlite3
-import pandas as pd
+import threading
 from datetime import datetime
+from functools import wraps
 
 # Page configuration
 st.set_page_config(page_title="Student Management", layout="wide")
@@ -10,18 +12,96 @@ st.set_page_config(page_title="Student Management", layout="wide")
 # DATABASE FUNCTIONS
 # ===========================
 
-def get_connection():
-    """Create and return a connection to the SQLite database."""
-    conn = sqlite3.connect('data.db')
-    return conn
+# Lock to serialize writes on the shared connection
+db_write_lock = threading.Lock()
+
+# Module-level SQL constants so sqlite3's statement cache can reuse
+# prepared statements across calls (identical strings hit the cache).
+SQL_INSERT = 'INSERT INTO students (name, email, phone, age) VALUES (?, ?, ?, ?)'
+SQL_SELECT_ALL = (
+    'SELECT id AS ID, name AS Name, email AS Email, phone AS Phone, age AS Age '
+    'FROM students'
+)
+SQL_FULL_LIST = (
+    "SELECT id, name, email, phone, age, printf('%d - %s', id, name) AS label "
+    'FROM students ORDER BY name'
+)
+SQL_COUNT = 'SELECT COUNT(*) FROM students'
 
+# Below this row count st.dataframe renders a plain list of dicts just as
+# well, so skip the DataFrame construction entirely.
+SMALL_TABLE_ROWS = 20
 
-def create_table():
-    """Create the students table if it doesn't exist."""
-    conn = get_connection()
-    cursor = conn.cursor()
-    
-    cursor.execute('''
+# Validate form input before touching the database; a regex match is far
+# cheaper than a transaction that has to be rolled back.
+EMAIL_RE = re.compile(r"^[^@\s]+@[^@\s]+\.[^@\s]+$")
+PHONE_RE = re.compile(r"^\+?[\d\s\-()]{7,20}$")
+
+
+@st.cache_resource
+def _db_state():
+    """Process-global mutable holder for the cache-invalidation counter.
+
+    st.cache_data entries are shared across sessions, so the version that
+    keys them must live at process scope too — a session_state counter
+    would let one session's stale entries shadow another's writes.
+    """
+    return {'version': 0}
+
+
+def _db_version():
+    """Current invalidation token for cached reads."""
+    return _db_state()['version']
+
+
+def _bump_db_version():
+    """Invalidate cached reads after a successful write."""
+    with db_write_lock:
+        _db_state()['version'] += 1
+
+
+def with_db(fn):
+    """Run ``fn`` with the cached connection, reporting SQLite errors.
+
+    The wrapped function receives the connection as its first argument;
+    on sqlite3.Error an error message is shown and None is returned.
+
+    For st.cache_data readers this must be the outermost decorator (with
+    the connection named ``_conn`` so it is not hashed): errors then
+    escape the cached function instead of being memoized as an empty
+    result until the next write bumps the version token.
+    """
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        try:
+            return fn(get_connection(), *args, **kwargs)
+        except sqlite3.Error as e:
+            st.error(f"❌ {fn.__name__}: {e}")
+            return None
+    return wrapper
+
+
+@st.cache_resource
+def get_connection():
+    """Create and return a single cached connection to the SQLite database.
+
+    The connection is shared across reruns and sessions so SQLite's
+    page cache survives between calls instead of being discarded on close.
+    Because st.cache_resource runs this once per process, the PRAGMAs and
+    schema setup below execute exactly once, not on every rerun.
+    """
+    conn = sqlite3.connect('data.db', check_same_thread=False)
+
+    # Tune SQLite once at startup: WAL lets readers proceed while a write
+    # is in flight, NORMAL sync skips the per-write journal fsync.
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    conn.execute('PRAGMA temp_store=MEMORY')
+    conn.execute('PRAGMA cache_size=-64000')
+    conn.execute('PRAGMA busy_timeout=5000')
+    conn.execute('PRAGMA mmap_size=268435456')
+
+    conn.execute('''
         CREATE TABLE IF NOT EXISTS students (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             name TEXT NOT NULL,
@@ -31,130 +111,142 @@ def create_table():
             created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
         )
     ''')
-    
+
+    # Covering index so ORDER BY name queries walk the index in order
+    # instead of scanning the table and sorting.
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_students_name_id ON students(name, id)')
+
     conn.commit()
-    conn.close()
+    return conn
 
 
-def insert_student(name, email, phone, age):
+@with_db
+def insert_student(conn, name, email, phone, age):
     """Insert a new student record into the database."""
-    conn = get_connection()
-    cursor = conn.cursor()
-    
-    try:
-        cursor.execute('''
-            INSERT INTO students (name, email, phone, age)
-            VALUES (?, ?, ?, ?)
-        ''', (name, email, phone, age))
-        
-        conn.commit()
-        st.success("✅ Student added successfully!")
-        return True
-    except Exception as e:
-        st.error(f"❌ Error adding student: {str(e)}")
-        return False
-    finally:
-        conn.close()
+    with db_write_lock, conn:
+        conn.execute(SQL_INSERT, (name, email, phone, age))
+    _bump_db_version()
+    st.success("✅ Student added successfully!")
+    return True
+
+
+@with_db
+def insert_students_bulk(conn, rows, chunk=450):
+    """Insert many (name, email, phone, age) rows, one transaction per chunk.
+
+    The chunk size keeps each batch well under SQLite's 999-parameter limit.
+    """
+    rows = list(rows)
+
+    for i in range(0, len(rows), chunk):
+        with db_write_lock, conn:
+            conn.executemany(SQL_INSERT, rows[i:i + chunk])
+    _bump_db_version()
+    return True
+
+
+@with_db
+@st.cache_data
+def _view_all_students(_conn, version):
+    """Retrieve all student records, cached per database version."""
+    count = _conn.execute(SQL_COUNT).fetchone()[0]
+
+    if count == 0:
+        return None
+
+    if count <= SMALL_TABLE_ROWS:
+        columns = ('ID', 'Name', 'Email', 'Phone', 'Age')
+        return [dict(zip(columns, row)) for row in _conn.execute(SQL_SELECT_ALL)]
+
+    # Imported lazily so cold starts that never hit a large View All
+    # don't pay the pandas import; repeat imports are cached.
+    import pandas as pd
+
+    return pd.read_sql_query(SQL_SELECT_ALL, _conn, dtype={'ID': 'int32', 'Age': 'Int16'})
 
 
 def view_all_students():
     """Retrieve all student records from the database."""
-    conn = get_connection()
-    cursor = conn.cursor()
-    
-    try:
-        cursor.execute('SELECT id, name, email, phone, age FROM students')
-        records = cursor.fetchall()
-        
-        if records:
-            df = pd.DataFrame(records, columns=['ID', 'Name', 'Email', 'Phone', 'Age'])
-            return df
-        else:
-            return None
-    except Exception as e:
-        st.error(f"❌ Error retrieving records: {str(e)}")
-        return None
-    finally:
-        conn.close()
+    return _view_all_students(_db_version())
 
 
-def get_student_by_id(student_id):
-    """Retrieve a specific student record by ID."""
-    conn = get_connection()
-    cursor = conn.cursor()
-    
-    try:
-        cursor.execute('SELECT id, name, email, phone, age FROM students WHERE id = ?', (student_id,))
-        record = cursor.fetchone()
-        return record
-    except Exception as e:
-        st.error(f"❌ Error retrieving student: {str(e)}")
-        return None
-    finally:
-        conn.close()
+@with_db
+@st.cache_data
+def _student_count(_conn, version):
+    """Count all students, cached per database version."""
+    return _conn.execute(SQL_COUNT).fetchone()[0]
 
 
-def get_all_student_ids():
-    """Get a list of all student IDs and names for selection."""
-    conn = get_connection()
-    cursor = conn.cursor()
-    
-    try:
-        cursor.execute('SELECT id, name FROM students ORDER BY name')
-        records = cursor.fetchall()
-        return records
-    except Exception as e:
-        st.error(f"❌ Error retrieving student list: {str(e)}")
-        return []
-    finally:
-        conn.close()
-
-
-def update_student(student_id, name, email, phone, age):
-    """Update an existing student record."""
-    conn = get_connection()
-    cursor = conn.cursor()
-    
-    try:
-        cursor.execute('''
-            UPDATE students
-            SET name = ?, email = ?, phone = ?, age = ?
-            WHERE id = ?
-        ''', (name, email, phone, age, student_id))
-        
-        conn.commit()
-        st.success("✅ Student updated successfully!")
-        return True
-    except Exception as e:
-        st.error(f"❌ Error updating student: {str(e)}")
-        return False
-    finally:
-        conn.close()
+def student_count():
+    """Get the total number of students."""
+    return _student_count(_db_version())
 
 
-def delete_student(student_id):
-    """Delete a student record from the database."""
-    conn = get_connection()
-    cursor = conn.cursor()
-    
-    try:
-        cursor.execute('DELETE FROM students WHERE id = ?', (student_id,))
-        conn.commit()
-        st.success("✅ Student deleted successfully!")
-        return True
-    except Exception as e:
-        st.error(f"❌ Error deleting student: {str(e)}")
+@with_db
+@st.cache_data
+def _get_all_students_full(_conn, version):
+    """Retrieve full student rows for selection, cached per database version."""
+    return _conn.execute(SQL_FULL_LIST).fetchall()
+
+
+def get_all_students_full():
+    """Get full (id, name, email, phone, age, label) rows for all students."""
+    return _get_all_students_full(_db_version())
+
+
+@with_db
+def update_student(conn, student_id, name, email, phone, age, original=None):
+    """Update an existing student record, writing only the changed columns.
+
+    ``original`` is the prefetched (id, name, email, phone, age, ...) row;
+    when given, unchanged columns are dropped from the UPDATE and a no-op
+    edit skips the statement (and its WAL write) entirely.
+    """
+    changes = {'name': name, 'email': email, 'phone': phone, 'age': age}
+    if original is not None:
+        current = dict(zip(('name', 'email', 'phone', 'age'), original[1:5]))
+        changes = {col: val for col, val in changes.items() if val != current[col]}
+
+        if not changes:
+            st.info("ℹ️ No changes to save.")
+            return True
+
+    set_clause = ', '.join(f'{col} = ?' for col in changes)
+    sql = f'UPDATE students SET {set_clause} WHERE id = ? RETURNING name'
+
+    with db_write_lock, conn:
+        row = conn.execute(sql, (*changes.values(), student_id)).fetchone()
+    if row is None:
+        st.error("❌ Student not found!")
         return False
-    finally:
-        conn.close()
+    _bump_db_version()
+    st.success(f"✅ Student '{row[0]}' updated successfully!")
+    return True
 
 
-# ===========================
-# INITIALIZE DATABASE
-# ===========================
+@with_db
+def delete_students(conn, student_ids, chunk=900):
+    """Delete many student records with one IN (...) statement per chunk.
+
+    The chunk size keeps each statement under SQLite's 999-parameter limit.
+    """
+    student_ids = list(student_ids)
+
+    if not student_ids:
+        return False
 
-# Create table on app startup
-create_table()
+    deleted = 0
+    for i in range(0, len(student_ids), chunk):
+        batch = student_ids[i:i + chunk]
+        placeholders = ','.join('?' * len(batch))
+        with db_write_lock, conn:
+            cursor = conn.execute(
+                f'DELETE FROM students WHERE id IN ({placeholders})', batch
+            )
+            deleted += cursor.rowcount
+    _bump_db_version()
+    st.success(f"✅ Deleted {deleted} student(s) successfully!")
+    return True
 
 
 # ===========================
@@ -170,15 +262,18 @@ operation = st.sidebar.radio(
     "Select Operation",
     ["📖 View All", "➕ Add Student", "✏️ Update Student", "🗑️ Delete Student"]
 )
+# Reserve the badge slot now but fill it after the branch logic below,
+# so a write in this run (e.g. Add Student) is reflected in the count.
+count_badge = st.sidebar.empty()
 
 # ===========================
 # VIEW ALL STUDENTS
 # ===========================
-if operation == "📖 View All":
-    st.header("View All Students")
-    
+@st.fragment
+def view_all_fragment():
+    """Render the student table; only this fragment reruns on its widgets."""
     df = view_all_students()
-    
+
     if df is not None:
         st.dataframe(df, use_container_width=True, hide_index=True)
         st.info(f"Total Students: {len(df)}")
@@ -186,10 +281,16 @@ if operation == "📖 View All":
         st.info("📭 No students found in the database.")
 
 
+if operation == "📖 View All":
+    st.header("View All Students")
+
+    view_all_fragment()
+
+
 # ===========================
 # ADD NEW STUDENT
 # ===========================
-elif operation == "➕ Add Student":
+if operation == "➕ Add Student":
     st.header("Add New Student")
     
     with st.form("add_student_form"):
@@ -201,31 +302,35 @@ elif operation == "➕ Add Student":
         submit_btn = st.form_submit_button("➕ Add Student", use_container_width=True)
         
         if submit_btn:
-            if name and email and phone and age:
-                insert_student(name, email, phone, age)
-            else:
+            if not (name and email and phone and age):
                 st.error("❌ Please fill in all fields!")
+            elif not EMAIL_RE.match(email):
+                st.error("❌ Please enter a valid email address!")
+            elif not PHONE_RE.match(phone):
+                st.error("❌ Please enter a valid phone number!")
+            else:
+                insert_student(name, email, phone, age)
 
 
 # ===========================
 # UPDATE STUDENT
 # ===========================
-elif operation == "✏️ Update Student":
-    st.header("Update Student Record")
-    
-    students = get_all_student_ids()
-    
+@st.fragment
+def update_student_fragment():
+    """Render the update panel; selection changes rerun only this fragment."""
+    students = get_all_students_full()
+
     if students:
-        # Create a selection option (ID - Name)
-        options = [f"{student[0]} - {student[1]}" for student in students]
-        selected = st.selectbox("Select Student to Update", options)
-        
-        # Extract the student ID from the selection
-        student_id = int(selected.split(" - ")[0])
-        
-        # Get the current student data
-        student = get_student_by_id(student_id)
-        
+        # Key the selectbox by id; the "ID - Name" label comes from SQL
+        by_id = {student[0]: student for student in students}
+        labels = {student[0]: student[5] for student in students}
+        student_id = st.selectbox(
+            "Select Student to Update", options=list(by_id), format_func=labels.get
+        )
+
+        # Look up the current student data from the prefetched rows
+        student = by_id.get(student_id)
+
         if student:
             st.info(f"Editing: {student[1]}")
             
@@ -238,43 +343,51 @@ elif operation == "✏️ Update Student":
                 submit_btn = st.form_submit_button("✏️ Update Student", use_container_width=True)
                 
                 if submit_btn:
-                    if name and email and phone and age:
-                        update_student(student_id, name, email, phone, age)
-                    else:
+                    if not (name and email and phone and age):
                         st.error("❌ Please fill in all fields!")
+                    elif not EMAIL_RE.match(email):
+                        st.error("❌ Please enter a valid email address!")
+                    elif not PHONE_RE.match(phone):
+                        st.error("❌ Please enter a valid phone number!")
+                    else:
+                        update_student(student_id, name, email, phone, age, original=student)
     else:
         st.info("📭 No students found. Please add a student first.")
 
 
+if operation == "✏️ Update Student":
+    st.header("Update Student Record")
+
+    update_student_fragment()
+
+
 # ===========================
 # DELETE STUDENT
 # ===========================
-elif operation == "🗑️ Delete Student":
-    st.header("Delete Student Record")
-    
-    students = get_all_student_ids()
-    
+@st.fragment
+def delete_student_fragment():
+    """Render the delete panel; selection changes rerun only this fragment."""
+    students = get_all_students_full()
+
     if students:
-        # Create a selection option (ID - Name)
-        options = [f"{student[0]} - {student[1]}" for student in students]
-        selected = st.selectbox("Select Student to Delete", options)
-        
-        # Extract the student ID from the selection
-        student_id = int(selected.split(" - ")[0])
-        
-        # Get the current student data for confirmation
-        student = get_student_by_id(student_id)
-        
-        if student:
-            st.warning(f"⚠️ Are you sure you want to delete: **{student[1]}**?")
-            
+        # Key the multiselect by id; the "ID - Name" label comes from SQL
+        by_id = {student[0]: student for student in students}
+        labels = {student[0]: student[5] for student in students}
+        student_ids = st.multiselect(
+            "Select Students to Delete", options=list(by_id), format_func=labels.get
+        )
+
+        if student_ids:
+            names = ", ".join(by_id[sid][1] for sid in student_ids)
+            st.warning(f"⚠️ Are you sure you want to delete: **{names}**?")
+
             col1, col2 = st.columns(2)
-            
+
             with col1:
                 if st.button("🗑️ Confirm Delete", use_container_width=True, type="secondary"):
-                    delete_student(student_id)
+                    delete_students(student_ids)
                     st.rerun()
-            
+
             with col2:
                 if st.button("❌ Cancel", use_container_width=True):
                     st.info("Deletion cancelled.")
@@ -282,6 +395,15 @@ elif operation == "🗑️ Delete Student":
         st.info("📭 No students found. Please add a student first.")
 
 
+if operation == "🗑️ Delete Student":
+    st.header("Delete Student Record")
+
+    delete_student_fragment()
+
+
+count_badge.info(f"Total Students: {student_count()}")
+
+
 # ===========================
 # FOOTER
 # ===========================